@@ -212,7 +212,7 @@ class _Index:
         self.type_to_handle_to_entries: Dict[
             Optional[_Type],
             Dict[Optional[lt.torrent_handle], Set[_IndexEntry]],
-        ] = collections.defaultdict(lambda: collections.defaultdict(set))
+        ] = {}
 
     def add(
         self,
@@ -223,7 +223,10 @@ class _Index:
     ) -> _IndexEntry:
         entry = _IndexEntry(iterator, types, handle, alert_mask)
         for type_ in entry.get_indexed_types():
-            self.type_to_handle_to_entries[type_][handle].add(entry)
+            handle_to_entries = self.type_to_handle_to_entries.setdefault(
+                type_, {}
+            )
+            handle_to_entries.setdefault(handle, set()).add(entry)
         return entry
 
     def remove(self, entry: _IndexEntry) -> None:
@@ -256,7 +259,10 @@ class _Index:
             else:
                 lookup_handles = (None,)
             for type_ in lookup_types:
-                handle_to_entries = type_to_handle_to_entries.get(type_, {})
+                # Avoid allocating a default for types nobody watches
+                handle_to_entries = type_to_handle_to_entries.get(type_)
+                if handle_to_entries is None:
+                    continue
                 for handle in lookup_handles:
                     entries = handle_to_entries.get(handle, ())
                     for entry in entries:
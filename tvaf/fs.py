@@ -42,6 +42,8 @@ from typing import Union
 
 Path = pathlib.PurePosixPath
 PathLike = Union[str, Path]
+# A path already split into components, as in PurePath.parts
+PathParts = Tuple[str, ...]
 
 
 def mkoserror(code: int, *args: Any) -> OSError:
@@ -180,30 +182,33 @@ class Node:
         return self.stat().filetype == stat_lib.S_IFLNK
 
 
+def _split(path: Union[PathLike, PathParts]) -> PathParts:
+    if isinstance(path, tuple):
+        return path
+    return Path(path).parts
+
+
 def _partial_traverse(
-    cur_dir: "Dir", path: Path, follow_symlinks=True
+    cur_dir: "Dir", parts: PathParts, follow_symlinks=True
 ) -> Tuple[Node, Path, Optional[OSError]]:
     # TODO: refactor this into some classes, if we keep fs past v1.0.
 
     seen_symlink: Dict[Symlink, Optional[Node]] = {}
 
     def inner(
-        cur_dir: Dir, path: Path, depth: int
+        cur_dir: Dir, parts: PathParts, depth: int
     ) -> Tuple[Node, Path, Optional[OSError]]:
-        if path.is_absolute():
+        if parts and parts[0] == "/":
             cur_dir = cur_dir.get_root()
-            path = path.relative_to("/")
+            parts = parts[1:]
 
         node: Node = cur_dir
-        i = 0
-        for i, part in enumerate(path.parts):
+        last = len(parts) - 1
+        for i, part in enumerate(parts):
             # If we fail before lookup, our remainder includes the current part
-            # we failed to lookup.
-            def rest() -> Path:
-                return Path().joinpath(*path.parts[i:])
-
+            # we failed to lookup. We only build remainders on failure.
             if not node.is_dir():
-                return node, rest(), mkoserror(errno.ENOTDIR)
+                return node, Path(*parts[i:]), mkoserror(errno.ENOTDIR)
 
             cur_dir = cast(Dir, node)
             if part == "..":
@@ -213,16 +218,14 @@ def _partial_traverse(
                 try:
                     node = cur_dir.lookup(part)
                 except OSError as ex:
-                    return cur_dir, rest(), ex
+                    return cur_dir, Path(*parts[i:]), ex
 
             # We looked up the next node. From here on, our remainder is
             # whatever we would lookup after this.
-            def rest() -> Path:
-                return Path().joinpath(*path.parts[i + 1 :])
 
             # Only do symlink lookup for the final path component if
             # follow_symlinks=True.
-            if i == len(path.parts) - 1 and depth == 0 and not follow_symlinks:
+            if i == last and depth == 0 and not follow_symlinks:
                 continue
 
             if node.is_link():
@@ -237,7 +240,11 @@ def _partial_traverse(
                     # We are trying to resolve this symlink somewhere in
                     # our call stack. We reached it again, so we're in a
                     # symlink loop.
-                    return symlink, rest(), mkoserror(errno.ELOOP)
+                    return (
+                        symlink,
+                        Path(*parts[i + 1 :]),
+                        mkoserror(errno.ELOOP),
+                    )
                 seen_symlink[symlink] = None
 
                 # Optimization: if symlink.target is a Node, we can use it
@@ -245,18 +252,18 @@ def _partial_traverse(
                 try:
                     target = symlink.readlink()
                 except OSError as ex:
-                    return symlink, rest(), ex
+                    return symlink, Path(*parts[i + 1 :]), ex
 
                 # Recurse into the symlink.
-                node, inner_rest, exc = inner(cur_dir, target, depth + 1)
+                node, inner_rest, exc = inner(cur_dir, target.parts, depth + 1)
                 if exc:
-                    return node, inner_rest.joinpath(rest()), exc
+                    return node, inner_rest.joinpath(*parts[i + 1 :]), exc
                 seen_symlink[symlink] = node
 
         # Success
         return node, Path(), None
 
-    return inner(cur_dir, path, 0)
+    return inner(cur_dir, parts, 0)
 
 
 class Dir(Node, abc.ABC):
@@ -307,12 +314,16 @@ class Dir(Node, abc.ABC):
             cur = cur.parent
         return cur
 
-    def traverse(self, path: PathLike, follow_symlinks=True) -> Node:
+    def traverse(
+        self, path: Union[PathLike, PathParts], follow_symlinks=True
+    ) -> Node:
         """Recursively look up a node by path.
 
         Args:
             path: A relative path to another node within this Dir. Must not be
-                an absolute path.
+                an absolute path. May also be a tuple of path components, as
+                in PurePath.parts, which skips splitting the path. Components
+                are used as-is, so they must not be empty or ".".
 
         Returns:
             A Node somewhere in the subtree of this Dir.
@@ -325,14 +336,14 @@ class Dir(Node, abc.ABC):
             OSError: If some other error occurs.
         """
         node, _, ex = _partial_traverse(
-            self, Path(path), follow_symlinks=follow_symlinks
+            self, _split(path), follow_symlinks=follow_symlinks
         )
         if ex is not None:
             raise ex
         return node
 
     def realpath(self, path: PathLike) -> Path:
-        node, rest, _ = _partial_traverse(self, Path(path))
+        node, rest, _ = _partial_traverse(self, Path(path).parts)
         return node.abspath().joinpath(rest)
 
     def path_to(self, other: Node) -> Path:
@@ -11,12 +11,14 @@
 # OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
 # PERFORMANCE OF THIS SOFTWARE.
 
+import collections
 import contextlib
 import errno
 import functools
 import io
 import logging
 import os
+import posixpath
 import socket as socket_lib
 import threading
 import time
@@ -48,9 +50,25 @@ def _partialclass(cls, *args, **kwds):
 
 
 class _FS(pyftpdlib.filesystems.AbstractedFS):
+
+    # pyftpdlib looks up the same paths many times per command (for example,
+    # once or more for each entry of a directory listing), and each traversal
+    # walks down from the root, so we keep recently-traversed nodes around.
+    # Likewise, it calls stat(), isdir(), getsize() and so on for the same
+    # path, so we remember stat results. The handler clears both caches at
+    # the start of each command.
+    traverse_cache_size = 256
+    stat_cache_size = 256
+
+    # collections.OrderedDict can't be subscripted at runtime before 3.7.2
+    _traverse_cache: "collections.OrderedDict[Tuple[str, bool], fs.Node]"
+    _stat_cache: "collections.OrderedDict[Tuple[str, bool], fs.Stat]"
+
     def __init__(self, *args, root: fs.Dir, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.cur_dir = root
+        self._traverse_cache = collections.OrderedDict()
+        self._stat_cache = collections.OrderedDict()
 
     def validpath(self, path: str) -> bool:
         # This is used to check whether a path traverses symlinks to escape a
@@ -93,11 +111,59 @@ class _FS(pyftpdlib.filesystems.AbstractedFS):
     def get_group_by_gid(self, gid: int) -> str:
         return "root"
 
+    def _invalidate_caches(self) -> None:
+        self._traverse_cache.clear()
+        self._stat_cache.clear()
+
+    def _cached_traverse(self, path: str, follow_symlinks: bool) -> fs.Node:
+        key = (cast(str, self.ftpnorm(path)), follow_symlinks)
+        cache = self._traverse_cache
+        node = cache.get(key)
+        if node is not None:
+            cache.move_to_end(key)
+            return node
+        node = self._traverse_uncached(key[0], follow_symlinks)
+        cache[key] = node
+        if len(cache) > self.traverse_cache_size:
+            cache.popitem(last=False)
+        return node
+
+    def _traverse_uncached(
+        self, ftppath: str, follow_symlinks: bool
+    ) -> fs.Node:
+        # Directory listings stat each entry by its full path. The listed
+        # directory itself is normally cached, so we only need to look up the
+        # last component, rather than walking down from the root again.
+        parent_path, name = posixpath.split(ftppath)
+        if name:
+            parent_key = (parent_path, True)
+            parent = self._traverse_cache.get(parent_key)
+            if parent is not None and parent.is_dir():
+                # Keep the directory cached while its entries stream through
+                self._traverse_cache.move_to_end(parent_key)
+                return cast(fs.Dir, parent).traverse(
+                    name, follow_symlinks=follow_symlinks
+                )
+        return self.cur_dir.traverse(ftppath, follow_symlinks=follow_symlinks)
+
+    def _cached_stat(self, path: str, follow_symlinks: bool) -> fs.Stat:
+        key = (cast(str, self.ftpnorm(path)), follow_symlinks)
+        cache = self._stat_cache
+        stat = cache.get(key)
+        if stat is not None:
+            cache.move_to_end(key)
+            return stat
+        stat = self._cached_traverse(key[0], follow_symlinks).stat()
+        cache[key] = stat
+        if len(cache) > self.stat_cache_size:
+            cache.popitem(last=False)
+        return stat
+
     def _traverse(self, path: str) -> fs.Node:
-        return self.cur_dir.traverse(path)
+        return self._cached_traverse(path, True)
 
     def _ltraverse(self, path: str) -> fs.Node:
-        return self.cur_dir.traverse(path, follow_symlinks=False)
+        return self._cached_traverse(path, False)
 
     def _traverse_to_dir(self, path: str) -> fs.Dir:
         dir_ = cast(fs.Dir, self._traverse(path))
@@ -114,6 +180,7 @@ class _FS(pyftpdlib.filesystems.AbstractedFS):
     def chdir(self, path: str) -> None:
         self.cur_dir = self._traverse_to_dir(path)
         self.cwd = str(self.cur_dir.abspath())
+        self._invalidate_caches()
 
     def open(self, filename: str, mode: str) -> io.BufferedIOBase:
         file_ = cast(fs.File, self._traverse(filename))
@@ -123,8 +190,11 @@ class _FS(pyftpdlib.filesystems.AbstractedFS):
         return fp
 
     def listdir(self, path: str) -> List[str]:
-        dir_ = self._traverse_to_dir(path)
-        return [d.name for d in dir_.readdir()]
+        # Build the list now. The transfer consumes the listing later, while
+        # readdir() may be iterating a live dict that a library or config
+        # change could resize. Listing here also raises errors for unlistable
+        # directories (like v1) before a transfer starts.
+        return [d.name for d in self._traverse_to_dir(path).readdir()]
 
     def listdirinfo(self, path: str) -> List[str]:
         # Doesn't seem to be used. However, the base class implements it and we
@@ -132,10 +202,10 @@ class _FS(pyftpdlib.filesystems.AbstractedFS):
         return self.listdir(path)
 
     def stat(self, path: str) -> os.stat_result:
-        return self._traverse(path).stat().os()
+        return self._cached_stat(path, True).os()
 
     def lstat(self, path: str) -> os.stat_result:
-        return self._ltraverse(path).stat().os()
+        return self._cached_stat(path, False).os()
 
     def readlink(self, path: str) -> str:
         return str(self._traverse_to_link(path).readlink())
@@ -166,10 +236,10 @@ class _FS(pyftpdlib.filesystems.AbstractedFS):
             return False
 
     def getsize(self, path: str) -> int:
-        return self._traverse(path).stat().size
+        return self._cached_stat(path, True).size
 
     def getmtime(self, path: str) -> int:
-        mtime = self._traverse(path).stat().mtime
+        mtime = self._cached_stat(path, True).mtime
         if mtime is not None:
             return mtime
         return int(time.time())
@@ -237,10 +307,52 @@ class _Authorizer(pyftpdlib.authorizers.DummyAuthorizer):
         self.auth_service.pop_user()
 
 
+class _FileProducer(pyftpdlib.handlers.FileProducer):
+    # pyftpdlib's FileProducer allocates a new bytes object for every block
+    # it reads. In binary mode, we read into one buffer per transfer instead.
+    # This is safe to reuse because asynchat only asks a producer for more
+    # data after it has sent everything from the previous block.
+
+    def __init__(self, file: io.IOBase, type: str) -> None:
+        super().__init__(file, type)
+        self._readinto = getattr(file, "readinto", None)
+        self._view: Optional[memoryview] = None
+        if type == "i" and self._readinto is not None:
+            self._view = memoryview(bytearray(self.buffer_size))
+
+    def more(self):
+        if self._view is None:
+            return super().more()
+        try:
+            size = self._readinto(self._view)
+            if size is None:
+                # Only non-blocking files return None. We can't wait for them
+                # here, and an empty block would end the transfer early
+                raise fs.mkoserror(errno.EAGAIN)
+        except OSError as exc:
+            # pyftpdlib uses this to report read errors to the client
+            raise pyftpdlib.handlers._FileReadWriteError(exc)
+        return self._view[:size]
+
+
+# Whether pyftpdlib found a usable sendfile() on this platform
+_SENDFILE_AVAILABLE = bool(pyftpdlib.handlers.FTPHandler.use_sendfile)
+
+
+def _has_fileno(fileobj: io.IOBase) -> bool:
+    try:
+        fileobj.fileno()
+    except (OSError, ValueError):
+        # io.UnsupportedOperation inherits both
+        return False
+    return True
+
+
 class _FTPHandler(pyftpdlib.handlers.FTPHandler):
 
     # pyftpd just tests for existence of fileno, but BytesIO and
     # BufferedTorrentIO expose fileno that raises io.UnsupportedOperation.
+    # We decide per transfer in push_dtp_data().
     use_sendfile = False
 
     def __init__(
@@ -248,7 +360,30 @@ class _FTPHandler(pyftpdlib.handlers.FTPHandler):
     ) -> None:
         super().__init__(*args, **kwargs)
         self.authorizer = _Authorizer(auth_service=auth_service)
-        self.abstracted_fs = _partialclass(_FS, root=root)
+        # pyftpdlib only ever calls abstracted_fs(root, cmd_channel)
+        self.abstracted_fs = functools.partial(_FS, root=root)
+
+    def pre_process_command(self, line: str, cmd: str, arg: str) -> None:
+        # Only cache lookups within a single command, so clients see changes
+        # to the library (such as new torrents) on their next command
+        if self.fs is not None:
+            self.fs._invalidate_caches()
+        super().pre_process_command(line, cmd, arg)
+
+    def push_dtp_data(
+        self,
+        data,
+        isproducer: bool = False,
+        file: io.IOBase = None,
+        cmd: str = None,
+    ) -> None:
+        if isproducer and type(data) is pyftpdlib.handlers.FileProducer:
+            data = _FileProducer(data.file, data.type)
+        # Use sendfile() only for files backed by a real file descriptor
+        self.use_sendfile = (
+            _SENDFILE_AVAILABLE and file is not None and _has_fileno(file)
+        )
+        super().push_dtp_data(data, isproducer=isproducer, file=file, cmd=cmd)
 
 
 def _create_server(address: Tuple) -> socket_lib.socket:
@@ -262,17 +397,30 @@ def _create_server(address: Tuple) -> socket_lib.socket:
         raise
 
 
+# Torrent reads block until the data is downloaded, and the async server
+# performs those reads on its IO loop. So by default we use a thread per
+# connection. Forking servers can't work, since the libtorrent session lives
+# in this process.
+_SERVER_MODELS = {
+    "thread": pyftpdlib.servers.ThreadedFTPServer,
+    "async": pyftpdlib.servers.FTPServer,
+}
+
+
 class FTPD(task_lib.Task, config_lib.HasConfig):
     def __init__(
         self,
         *,
         config: config_lib.Config,
         root: fs.Dir,
-        auth_service: auth.AuthService
+        auth_service: auth.AuthService,
     ) -> None:
         super().__init__(title="FTPD", thread_name="ftpd")
-        self._auth_service = auth_service
-        self._root = root
+        # pyftpdlib reads class attributes from the handler, so it must be a
+        # class. Create it once rather than on every reconfiguration
+        self._handler = _partialclass(
+            _FTPHandler, root=root, auth_service=auth_service
+        )
 
         # TODO: fixup typing here
         self._lock: threading.Condition = threading.Condition(  # type: ignore
@@ -280,6 +428,7 @@ class FTPD(task_lib.Task, config_lib.HasConfig):
         )
         self._server: Optional[pyftpdlib.servers.FTPServer] = None
         self._address: Optional[Tuple] = None
+        self._server_model: Optional[str] = None
 
         self.set_config(config)
 
@@ -295,6 +444,7 @@ class FTPD(task_lib.Task, config_lib.HasConfig):
         config.setdefault("ftp_enabled", True)
         config.setdefault("ftp_bind_address", "localhost")
         config.setdefault("ftp_port", 8821)
+        config.setdefault("ftp_server_model", "thread")
 
         address: Optional[Tuple] = None
         socket: Optional[socket_lib.socket] = None
@@ -306,27 +456,47 @@ class FTPD(task_lib.Task, config_lib.HasConfig):
                 config.require_int("ftp_port"),
             )
 
-        with self._lock:
-            if address != self._address and address is not None:
-                socket = _create_server(address)
+        server_model = config.require_str("ftp_server_model")
+        server_cls = _SERVER_MODELS.get(server_model)
+        if server_cls is None:
+            raise config_lib.InvalidConfigError(
+                f"invalid ftp server model {server_model}"
+            )
 
-            yield
+        with self._lock:
+            changed = (
+                address != self._address or server_model != self._server_model
+            )
+            if changed and address is not None:
+                if address == self._address and self._server is not None:
+                    # Only the server model changed. The old server still
+                    # holds the address, so binding again would fail. Share
+                    # its listening socket instead; closing the old server
+                    # only closes its own descriptor.
+                    socket = self._server.socket.dup()
+                else:
+                    socket = _create_server(address)
+
+            try:
+                yield
+            except BaseException:
+                if socket is not None:
+                    socket.close()
+                raise
 
             if self._terminated.is_set():
                 return
-            if address == self._address:
+            if not changed:
                 return
 
             self._address = address
+            self._server_model = server_model
             self._terminate()
 
             if socket is None:
                 return
 
-            handler = _partialclass(
-                _FTPHandler, root=self._root, auth_service=self._auth_service
-            )
-            self._server = pyftpdlib.servers.ThreadedFTPServer(socket, handler)
+            self._server = server_cls(socket, self._handler)
 
     def _terminate(self):
         with self._lock:
@@ -345,5 +515,7 @@ class FTPD(task_lib.Task, config_lib.HasConfig):
                 if _LOG.isEnabledFor(logging.INFO):
                     host, port = server.socket.getsockname()
                     _LOG.info("ftp server listening on %s:%s", host, port)
-                server.serve_forever()
+                # The async server otherwise polls with no timeout, and
+                # wouldn't notice close_all() from another thread
+                server.serve_forever(timeout=1.0)
                 _LOG.info("ftp server shut down")
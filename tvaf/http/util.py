@@ -13,11 +13,13 @@
 
 from typing import Any
 from typing import Callable
+from typing import Tuple
 from typing import Union
 
 import flask
 
 _AppLike = Union[flask.Flask, flask.Blueprint]
+_Undecorator = Callable[[Any, _AppLike], None]
 
 
 def route(rule: str, **options: Any) -> Callable[[Callable], Callable]:
@@ -37,12 +39,24 @@ def route(rule: str, **options: Any) -> Callable[[Callable], Callable]:
 
 
 class Blueprint:
+
+    # Collected once per class in __init_subclass__, rather than scanning
+    # dir(self) for every instance
+    _undecorators: Tuple[_Undecorator, ...] = ()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        undecorators = []
+        for attr_name in dir(cls):
+            undecorate = getattr(
+                getattr(cls, attr_name, None), "_undecorate", None
+            )
+            if undecorate is not None:
+                undecorators.append(undecorate)
+        cls._undecorators = tuple(undecorators)
+
     def __init__(self, name: str, import_name: str, **kwargs) -> None:
         self.blueprint = flask.Blueprint(name, import_name, **kwargs)
 
-        for attr_name in dir(self):
-            target = getattr(self, attr_name)
-            undecorate = getattr(target, "_undecorate", None)
-            if undecorate is None:
-                continue
+        for undecorate in self._undecorators:
             undecorate(self, self.blueprint)
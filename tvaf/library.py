@@ -30,14 +30,18 @@ import io
 import logging
 import pathlib
 import stat as stat_lib
+import sys
+import threading
 from typing import Any
 from typing import Callable
 from typing import Dict
 from typing import Iterator
+from typing import List
 from typing import Mapping
 from typing import MutableMapping
 from typing import Optional
 from typing import Sequence
+from typing import Tuple
 
 import libtorrent as lt
 
@@ -93,6 +97,43 @@ def _is_valid_path(path: Sequence[str]) -> bool:
     return True
 
 
+class _FilesByIndex(fs.Dir):
+    """The i/ directory of a torrent, whose children are named by file index.
+
+    File indexes are dense, so we keep a list indexed by file index, rather
+    than a dict keyed by str(index).
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._files: List[Optional[TorrentFile]] = []
+
+    def add(self, index: int, torrent_file: TorrentFile) -> None:
+        if index >= len(self._files):
+            self._files.extend([None] * (index + 1 - len(self._files)))
+        torrent_file.name = str(index)
+        torrent_file.parent = self
+        self._files[index] = torrent_file
+
+    def get_node(self, name: str) -> Optional[fs.Node]:
+        try:
+            index = int(name)
+        except ValueError:
+            return None
+        if not 0 <= index < len(self._files):
+            return None
+        # int() accepts spellings like "01", " 1" and "+1"; only the
+        # canonical name refers to the file
+        if str(index) != name:
+            return None
+        return self._files[index]
+
+    def readdir(self) -> Iterator[fs.Dirent]:
+        for index, torrent_file in enumerate(self._files):
+            if torrent_file is not None:
+                yield fs.Dirent(name=str(index), stat=torrent_file.stat())
+
+
 class _V1TorrentInNetwork(fs.StaticDir):
     def __init__(
         self,
@@ -105,7 +146,7 @@ class _V1TorrentInNetwork(fs.StaticDir):
 
         self._by_path = fs.StaticDir()
         self.mkchild("f", self._by_path)
-        self._by_index = fs.StaticDir()
+        self._by_index = _FilesByIndex()
         self.mkchild("i", self._by_index)
 
         for spec in info.iter_files():
@@ -131,7 +172,7 @@ class _V1TorrentInNetwork(fs.StaticDir):
             stop=spec.stop,
             configure_atp=network.configure_atp,
         )
-        self._by_index.mkchild(str(spec.index), torrent_file)
+        self._by_index.add(spec.index, torrent_file)
 
         if not _is_valid_path(spec.full_path):
             return
@@ -173,8 +214,8 @@ class _V1Torrent(fs.Dir):
         if not network.can_access(self.info_hash):
             return None
 
-        return _V1TorrentInNetwork(
-            self.libs, self.info_hash, self.info, network
+        return self.libs._get_torrent_in_network(
+            self.info_hash, self.info, name, network
         )
 
     def readdir(self) -> Iterator[fs.Dirent]:
@@ -198,6 +239,10 @@ class _V1(fs.Dir):
             )
         except Error:
             return None
+        # This string is used as a key in our caches and in RequestService.
+        # Interning it makes equal keys identical, so lookups compare by
+        # pointer. We only intern names of known torrents
+        info_hash = types.InfoHash(sys.intern(info_hash))
         return _V1Torrent(self.libs, info_hash, protocol.Info(info_dict))
 
     def readdir(self) -> Iterator[fs.Dirent]:
@@ -302,11 +347,43 @@ class Libraries:
 
 
 class LibraryService:
+
+    # Building a torrent's directory tree takes time linear in its number of
+    # files, and every request looks the torrent up again. Torrent info is
+    # immutable for a given info hash, so we keep recently-used trees around.
+    torrent_dir_cache_size = 64
+
     def __init__(self, *, opener: TorrentFileOpener, libraries: Libraries):
         self.opener = opener
         self.libraries = libraries
         self.root = _Root(libs=self)
         self.browse_nodes: Dict[str, fs.Node] = {}
+        self._torrent_dirs: collections.OrderedDict[
+            Tuple[types.InfoHash, str], Tuple[Network, fs.Dir]
+        ] = collections.OrderedDict()
+        self._torrent_dirs_lock = threading.Lock()
+
+    def _get_torrent_in_network(
+        self,
+        info_hash: types.InfoHash,
+        info: protocol.Info,
+        name: str,
+        network: Network,
+    ) -> fs.Dir:
+        key = (info_hash, name)
+        with self._torrent_dirs_lock:
+            cached = self._torrent_dirs.get(key)
+            # The network may have been replaced since we cached this
+            if cached is not None and cached[0] is network:
+                self._torrent_dirs.move_to_end(key)
+                return cached[1]
+        torrent_dir = _V1TorrentInNetwork(self, info_hash, info, network)
+        with self._torrent_dirs_lock:
+            self._torrent_dirs[key] = (network, torrent_dir)
+            self._torrent_dirs.move_to_end(key)
+            if len(self._torrent_dirs) > self.torrent_dir_cache_size:
+                self._torrent_dirs.popitem(last=False)
+        return torrent_dir
 
     @staticmethod
     def get_torrent_path(info_hash: types.InfoHash) -> Path:
@@ -21,6 +21,7 @@ import logging
 import pathlib
 import threading
 from typing import Any
+from typing import Callable
 from typing import Dict
 from typing import Iterable
 from typing import Iterator
@@ -424,6 +425,11 @@ class _Cleanup:
             self._cleanup_inner()
 
 
+# Each handler takes its own alert subclass, so the table can't be typed
+# more precisely
+_AlertHandler = Callable[[Any, Any], None]
+
+
 class _TorrentTask(task_lib.Task):
     def __init__(
         self,
@@ -485,24 +491,50 @@ class _TorrentTask(task_lib.Task):
                 self._state.set_exception(CanceledError())
             self._lock.notify_all()
 
+    def _handle_read_piece_locked(self, alert: lt.read_piece_alert) -> None:
+        exc = ltpy.exception_from_error_code(alert.error)
+        self._state.on_read_piece(alert.piece, alert.buffer, exc)
+
+    def _handle_torrent_removed_locked(
+        self, alert: lt.torrent_removed_alert
+    ) -> None:
+        raise TorrentRemovedError()
+
+    def _handle_save_resume_data_locked(
+        self, alert: lt.save_resume_data_alert
+    ) -> None:
+        if alert.params.ti is not None:
+            self._state.set_ti(alert.params.ti)
+
+    def _handle_torrent_error_locked(
+        self, alert: lt.torrent_error_alert
+    ) -> None:
+        # These are mostly disk errors
+        exc = ltpy.exception_from_error_code(alert.error)
+        if exc is not None:
+            raise exc
+
+    def _handle_metadata_received_locked(
+        self, alert: lt.metadata_received_alert
+    ) -> None:
+        self._resume_service.save(
+            alert.handle, flags=lt.torrent_handle.save_info_dict
+        )
+
+    # Dispatch on the exact alert type with one dict lookup. read_piece_alert
+    # is by far the most common
+    _ALERT_HANDLERS: Dict[type, _AlertHandler] = {
+        lt.read_piece_alert: _handle_read_piece_locked,
+        lt.torrent_removed_alert: _handle_torrent_removed_locked,
+        lt.save_resume_data_alert: _handle_save_resume_data_locked,
+        lt.torrent_error_alert: _handle_torrent_error_locked,
+        lt.metadata_received_alert: _handle_metadata_received_locked,
+    }
+
     def _handle_alert_locked(self, alert: lt.alert) -> None:
-        if isinstance(alert, lt.read_piece_alert):
-            exc = ltpy.exception_from_error_code(alert.error)
-            self._state.on_read_piece(alert.piece, alert.buffer, exc)
-        elif isinstance(alert, lt.torrent_removed_alert):
-            raise TorrentRemovedError()
-        elif isinstance(alert, lt.save_resume_data_alert):
-            if alert.params.ti is not None:
-                self._state.set_ti(alert.params.ti)
-        elif isinstance(alert, lt.torrent_error_alert):
-            # These are mostly disk errors
-            exc = ltpy.exception_from_error_code(alert.error)
-            if exc is not None:
-                raise exc
-        elif isinstance(alert, lt.metadata_received_alert):
-            self._resume_service.save(
-                alert.handle, flags=lt.torrent_handle.save_info_dict
-            )
+        handler = self._ALERT_HANDLERS.get(type(alert))
+        if handler is not None:
+            handler(self, alert)
 
     def _handle_alerts_until_no_requests(
         self, handle: lt.torrent_handle
@@ -11,17 +11,23 @@
 # OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
 # PERFORMANCE OF THIS SOFTWARE.
 
+import collections
 import concurrent.futures
-import contextlib
+import itertools
 import logging
-import math
+import os
 import pathlib
-import re
 import threading
+from typing import Any
 from typing import Callable
 from typing import cast
+from typing import Deque
+from typing import Dict
+from typing import Generator
 from typing import Iterator
 from typing import Optional
+from typing import Sequence
+from typing import Tuple
 import warnings
 
 import libtorrent as lt
@@ -33,7 +39,20 @@ from tvaf import task as task_lib
 _LOG = logging.getLogger(__name__)
 
 RESUME_DATA_DIR_NAME = "resume"
-SAVE_ALL_INTERVAL = math.tan(1.5657)  # ~196
+SAVE_ALL_INTERVAL = 300.0
+IO_CONCURRENCY = 4
+
+_HEX_DIGITS = "0123456789abcdef"
+
+# save_resume_data() flags, looked up once rather than through the
+# torrent_handle class for every save
+_ONLY_IF_MODIFIED = lt.torrent_handle.only_if_modified
+_FLUSH_DISK_CACHE = lt.torrent_handle.flush_disk_cache
+_SAVE_INFO_DICT = lt.torrent_handle.save_info_dict
+
+_WRITE_FLAGS = (
+    os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+)
 
 
 class _Underflow(Exception):
@@ -43,7 +62,8 @@ class _Underflow(Exception):
 
 class _Counter:
     def __init__(self):
-        self._condition = threading.Condition()
+        # Never acquired recursively, so avoid the RLock default
+        self._condition = threading.Condition(threading.Lock())
         self._value: int = 0
 
     def inc(self, delta: int) -> int:
@@ -67,7 +87,9 @@ class _Counter:
 
 def _try_read(path: pathlib.Path) -> Optional[bytes]:
     try:
-        return path.read_bytes()
+        # Unbuffered: we read the whole file at once anyway
+        with open(path, mode="rb", buffering=0) as fp:
+            return fp.readall()
     except FileNotFoundError:
         return None
     except OSError:
@@ -101,46 +123,126 @@ def _try_load_atp(path: pathlib.Path) -> Optional[lt.add_torrent_params]:
         return None
 
 
+def _try_load_resume_data(
+    path: pathlib.Path,
+) -> Optional[lt.add_torrent_params]:
+    atp = _try_load_atp(path)
+    if not atp:
+        return None
+    if atp.ti is None:
+        atp.ti = _try_load_ti(path.with_suffix(".torrent"))
+    return atp
+
+
+def _is_resume_data_name(name: str) -> bool:
+    # <40 lowercase hex digits>.resume. strip() removes all hex digits from
+    # the ends, so it leaves nothing exactly when the stem is all hex
+    return (
+        len(name) == 47
+        and name.endswith(".resume")
+        and not name[:40].strip(_HEX_DIGITS)
+    )
+
+
+def _iter_resume_data_paths(
+    resume_data_dir: pathlib.Path,
+) -> Iterator[pathlib.Path]:
+    try:
+        entries = os.scandir(resume_data_dir)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    with entries:
+        for entry in entries:
+            # Filter by name before creating any Path objects
+            if _is_resume_data_name(entry.name):
+                yield pathlib.Path(entry.path)
+
+
 def iter_resume_data_from_disk(
     config_dir: pathlib.Path,
-) -> Iterator[lt.add_torrent_params]:
+) -> Generator[lt.add_torrent_params, None, None]:
     resume_data_dir = config_dir.joinpath(RESUME_DATA_DIR_NAME)
-    if not resume_data_dir.is_dir():
+    # Overlap the reads (and any parsing that drops the GIL), but only keep
+    # IO_CONCURRENCY loads in flight, so we don't read every file into memory
+    # before the caller consumes any. Results are yielded in scan order.
+    pending: Deque[concurrent.futures.Future] = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=IO_CONCURRENCY, thread_name_prefix="fastresume.load"
+    ) as executor:
+        try:
+            for path in _iter_resume_data_paths(resume_data_dir):
+                if len(pending) >= IO_CONCURRENCY:
+                    atp = pending.popleft().result()
+                    if atp:
+                        yield atp
+                pending.append(executor.submit(_try_load_resume_data, path))
+            while pending:
+                atp = pending.popleft().result()
+                if atp:
+                    yield atp
+        finally:
+            # If the caller stops early, don't load what's left
+            for future in pending:
+                future.cancel()
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def _write_chunks(fd: int, chunks: Sequence[bytes]) -> None:
+    if len(chunks) == 1 or not hasattr(os, "writev"):
+        _write_all(fd, b"".join(chunks))
         return
-    for path in resume_data_dir.iterdir():
-        if path.suffixes != [".resume"]:
-            continue
-        if not re.match(r"[0-9a-f]{40}", path.stem):
-            continue
+    # Gather the chunks in the kernel, rather than concatenating them here
+    written = os.writev(fd, chunks)
+    if written < sum(len(chunk) for chunk in chunks):
+        _write_all(fd, b"".join(chunks)[written:])
 
-        atp = _try_load_atp(path)
-        if not atp:
-            continue
 
-        if atp.ti is None:
-            atp.ti = _try_load_ti(path.with_suffix(".torrent"))
-        yield atp
+def _fsync_dir(path: str) -> None:
+    # Persist the rename. Directories can't be opened on Windows, where
+    # MoveFileEx is durable on its own
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
 
-@contextlib.contextmanager
-def _write_safe_log(path: pathlib.Path) -> Iterator[pathlib.Path]:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = path.with_suffix(".tmp")
+def _write_safe_log(path: pathlib.Path, *chunks: bytes) -> None:
+    path_str = os.fspath(path)
+    os.makedirs(os.path.dirname(path_str), exist_ok=True)
+    tmp_path = path_str + ".tmp"
+    fd = os.open(tmp_path, _WRITE_FLAGS, 0o644)
     try:
-        yield tmp_path
-        # Atomic on Linux and Windows, apparently
-        tmp_path.replace(path)
-    finally:
         try:
-            tmp_path.unlink()
+            _write_chunks(fd, chunks)
+            # Without this, a crash shortly after replace() can leave an
+            # empty file on some filesystems (ext4 with delalloc, xfs)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        # Atomic on Linux and Windows, apparently. This consumes tmp_path
+        os.replace(tmp_path, path_str)
+        _fsync_dir(os.path.dirname(path_str))
+    except BaseException:
+        # Only clean up on failure, to save a syscall on success
+        try:
+            os.unlink(tmp_path)
         except FileNotFoundError:
             pass
+        raise
     _LOG.debug("wrote: %s", path)
 
 
 def _delete(path: pathlib.Path) -> None:
     try:
-        path.unlink()
+        os.unlink(path)
         _LOG.debug("deleted: %s", path)
     except FileNotFoundError:
         pass
@@ -154,6 +256,11 @@ def _delete(path: pathlib.Path) -> None:
 # save_resume_data() yields exactly one save_resume_data[_failed]_alert.
 
 
+# Each handler takes its own alert subclass, so the table can't be typed
+# more precisely
+_AlertHandler = Callable[[Any, Any], None]
+
+
 class _ReceiverTask(task_lib.Task):
     def __init__(
         self,
@@ -162,7 +269,7 @@ class _ReceiverTask(task_lib.Task):
         resume_service: "ResumeService",
         alert_driver: driver_lib.AlertDriver,
         session: lt.session,
-        pedantic=False
+        pedantic=False,
     ):
         super().__init__(
             title="fastresume data receiver", thread_name="fastresume.receiver"
@@ -170,12 +277,21 @@ class _ReceiverTask(task_lib.Task):
         self._counter = counter
         self._resume_service = resume_service
         self._session = session
-        # Single thread so we synchronize writes/deletes for the same infohash
-        # TODO: do something with more throughput
-        self._io_executor = concurrent.futures.ThreadPoolExecutor(
-            max_workers=1
-        )
+        # Writes/deletes for the same infohash must happen in order, so each
+        # infohash always maps to the same single-threaded executor
+        self._io_executors = [
+            concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="fastresume.io"
+            )
+            for _ in range(IO_CONCURRENCY)
+        ]
         self._check_executor = concurrent.futures.ThreadPoolExecutor()
+        # The sequence number of the latest IO queued for each path. A queued
+        # write is skipped if a later write or delete of the same file is
+        # queued behind it
+        self._latest_io: Dict[pathlib.Path, int] = {}
+        self._latest_io_lock = threading.Lock()
+        self._io_seq = itertools.count()
         # We handle metadata_received_alert so we're sure to get it at shutdown
         self._iterator = alert_driver.iter_alerts(
             lt.alert_category.status,
@@ -190,41 +306,107 @@ class _ReceiverTask(task_lib.Task):
     def _terminate(self) -> None:
         self._iterator.close()
 
-    def _io_submit(self, func: Callable, *args, **kwargs) -> None:
-        future = self._io_executor.submit(func, *args, **kwargs)
+    def _io_submit(
+        self, info_hash: lt.sha1_hash, func: Callable, *args, **kwargs
+    ) -> None:
+        shard = info_hash.to_bytes()[0] % IO_CONCURRENCY
+        future = self._io_executors[shard].submit(func, *args, **kwargs)
         task_lib.log_future_exceptions(future, "in io task")
         if self._pedantic:
             task_lib.terminate_task_on_future_fail(self, future)
 
+    def _supersede(self, path: pathlib.Path) -> int:
+        with self._latest_io_lock:
+            seq = next(self._io_seq)
+            self._latest_io[path] = seq
+            return seq
+
+    def _pop_if_latest(self, path: pathlib.Path, seq: int) -> bool:
+        with self._latest_io_lock:
+            if self._latest_io.get(path) != seq:
+                return False
+            del self._latest_io[path]
+            return True
+
+    def _check_or_forget(
+        self, check: concurrent.futures.Future, info_hash: lt.sha1_hash
+    ) -> bool:
+        if check.result():
+            return True
+        # A save for a removed torrent cached its paths again after the
+        # delete forgot them
+        self._resume_service.forget_paths(info_hash)
+        return False
+
     def _write_atp(
         self,
         check: concurrent.futures.Future,
         info_hash: lt.sha1_hash,
+        path: pathlib.Path,
+        seq: int,
         data: bytes,
     ) -> None:
-        if not check.result():
+        if not self._pop_if_latest(path, seq):
             return
-        path = self._resume_service.get_resume_data_path(info_hash)
-        with _write_safe_log(path) as tmp_path:
-            tmp_path.write_bytes(data)
+        if not self._check_or_forget(check, info_hash):
+            return
+        _write_safe_log(path, data)
 
     def _write_ti(
         self,
         check: Optional[concurrent.futures.Future],
         info_hash: lt.sha1_hash,
+        path: pathlib.Path,
+        seq: int,
         metadata: bytes,
     ) -> None:
-        if check is not None and not check.result():
+        if not self._pop_if_latest(path, seq):
             return
+        if check is not None and not self._check_or_forget(check, info_hash):
+            return
+        # Metadata is the bencoded infodict itself. We want to write a proper
+        # .torrent file. We can skip the bdecode/bencode step if we just write
+        # bencoded data directly
+        _write_safe_log(path, b"d4:info", metadata, b"e")
+
+    def _delete_seq(self, path: pathlib.Path, seq: int) -> None:
+        # Never skip deletes. If a write follows torrent_removed_alert, it
+        # will be skipped by its check, and the file must still be deleted
+        self._pop_if_latest(path, seq)
+        _delete(path)
+
+    def _submit_write_ti(
+        self,
+        check: Optional[concurrent.futures.Future],
+        info_hash: lt.sha1_hash,
+        metadata: bytes,
+    ) -> None:
         path = self._resume_service.get_torrent_path(info_hash)
-        with _write_safe_log(path) as tmp_path:
-            # Metadata is the bencoded infodict itself. We want to write a
-            # proper .torrent file. We can skip the bdecode/bencode step if we
-            # just write bencoded data directly
-            with tmp_path.open(mode="wb") as fp:
-                fp.write(b"d4:info")
-                fp.write(metadata)
-                fp.write(b"e")
+        seq = self._supersede(path)
+        self._io_submit(
+            info_hash, self._write_ti, check, info_hash, path, seq, metadata
+        )
+
+    def _submit_write_atp(
+        self,
+        check: concurrent.futures.Future,
+        info_hash: lt.sha1_hash,
+        data: bytes,
+    ) -> None:
+        path = self._resume_service.get_resume_data_path(info_hash)
+        seq = self._supersede(path)
+        self._io_submit(
+            info_hash, self._write_atp, check, info_hash, path, seq, data
+        )
+
+    def _submit_delete(self, info_hash: lt.sha1_hash) -> None:
+        for path in (
+            self._resume_service.get_resume_data_path(info_hash),
+            self._resume_service.get_torrent_path(info_hash),
+        ):
+            seq = self._supersede(path)
+            self._io_submit(info_hash, self._delete_seq, path, seq)
+        self._resume_service.forget_paths(info_hash)
 
     def _dec(self) -> None:
         try:
@@ -239,71 +421,84 @@ class _ReceiverTask(task_lib.Task):
             if self._pedantic:
                 raise
 
-    def _handle_alert(self, alert: lt.alert) -> None:
-        if isinstance(alert, lt.save_resume_data_alert):
-            atp = alert.params
-            handle = alert.handle
-            info_hash = handle.info_hash()
-
-            # NB: when save_resume_data_alert follows torrent_removed_alert,
-            # the handle may still be alive when we receive the alert
-            # (handle.is_valid() is True). If we persist data in this case,
-            # and later load it, the user will see a zombie torrent they
-            # thought they removed.
-
-            # The list of active torrents in the session is synchronized with
-            # add_torrent_alert and torrent_removed_alert, so find_torrent()
-            # will never return a handle after torrent_removed_alert was
-            # posted. See https://github.com/arvidn/libtorrent/issues/5112
-            check = self._check_executor.submit(
-                ltpy.handle_in_session, handle, self._session
-            )
+    def _handle_save_resume_data(
+        self, alert: lt.save_resume_data_alert
+    ) -> None:
+        atp = alert.params
+        handle = alert.handle
+
+        # NB: when save_resume_data_alert follows torrent_removed_alert, the
+        # handle may still be alive when we receive the alert
+        # (handle.is_valid() is True). If we persist data in this case, and
+        # later load it, the user will see a zombie torrent they thought they
+        # removed.
+
+        # The list of active torrents in the session is synchronized with
+        # add_torrent_alert and torrent_removed_alert, so find_torrent() will
+        # never return a handle after torrent_removed_alert was posted. See
+        # https://github.com/arvidn/libtorrent/issues/5112
+        check = self._check_executor.submit(
+            ltpy.handle_in_session, handle, self._session
+        )
 
-            # Unconditionally submit to our IO queue, so when we terminate we
-            # can wait for it to drain
-            if atp.ti is not None:
-                with ltpy.translate_exceptions():
-                    metadata = atp.ti.metadata()
-                self._io_submit(self._write_ti, check, atp.info_hash, metadata)
-
-            # The add_torrent_params object is managed with alert memory. We
-            # must do write_resume_data() before the next pop_alerts().
-            # It would be more efficient to set ti to None and use
-            # write_resume_data_buf(), but other alert handlers would see the
-            # mutation
-            with ltpy.translate_exceptions():
-                bdict = lt.write_resume_data(atp)
-                bdict.pop(b"info", None)
-                data = lt.bencode(bdict)
-            self._io_submit(self._write_atp, check, atp.info_hash, data)
-            self._dec()
-        elif isinstance(alert, lt.save_resume_data_failed_alert):
-            self._dec()
-        elif isinstance(alert, lt.add_torrent_alert):
-            if alert.error.value():
-                return
-            # NB: If someone calls async_add_torrent() without
-            # duplicate_is_error and the torrent exists, we will get an
-            # add_torrent_alert with the params they passed, NOT the original
-            # or current params
-            atp = alert.params
-            if atp.ti is None:
-                return
+        # Unconditionally submit to our IO queue, so when we terminate we can
+        # wait for it to drain
+        if atp.ti is not None:
             with ltpy.translate_exceptions():
                 metadata = atp.ti.metadata()
-            self._io_submit(self._write_ti, None, atp.info_hash, metadata)
-        elif isinstance(alert, lt.torrent_removed_alert):
-            info_hash = alert.info_hash
-            self._io_submit(
-                _delete, self._resume_service.get_resume_data_path(info_hash)
-            )
-            self._io_submit(
-                _delete, self._resume_service.get_torrent_path(info_hash)
-            )
-        elif isinstance(alert, lt.metadata_received_alert):
-            self._resume_service.save(
-                alert.handle, flags=lt.torrent_handle.save_info_dict
-            )
+            self._submit_write_ti(check, atp.info_hash, metadata)
+
+        # The add_torrent_params object is managed with alert memory. We must
+        # do write_resume_data() before the next pop_alerts(). It would be
+        # more efficient to set ti to None and use write_resume_data_buf(),
+        # but other alert handlers would see the mutation
+        with ltpy.translate_exceptions():
+            bdict = lt.write_resume_data(atp)
+            bdict.pop(b"info", None)
+            data = lt.bencode(bdict)
+        self._submit_write_atp(check, atp.info_hash, data)
+        self._dec()
+
+    def _handle_save_resume_data_failed(
+        self, alert: lt.save_resume_data_failed_alert
+    ) -> None:
+        self._dec()
+
+    def _handle_add_torrent(self, alert: lt.add_torrent_alert) -> None:
+        if alert.error.value():
+            return
+        # NB: If someone calls async_add_torrent() without duplicate_is_error
+        # and the torrent exists, we will get an add_torrent_alert with the
+        # params they passed, NOT the original or current params
+        atp = alert.params
+        if atp.ti is None:
+            return
+        with ltpy.translate_exceptions():
+            metadata = atp.ti.metadata()
+        self._submit_write_ti(None, atp.info_hash, metadata)
+
+    def _handle_torrent_removed(self, alert: lt.torrent_removed_alert) -> None:
+        self._submit_delete(alert.info_hash)
+
+    def _handle_metadata_received(
+        self, alert: lt.metadata_received_alert
+    ) -> None:
+        self._resume_service.save(alert.handle, flags=_SAVE_INFO_DICT)
+
+    # Dispatch on the exact alert type with one dict lookup, rather than a
+    # chain of isinstance() checks per alert
+    _ALERT_HANDLERS: Dict[type, _AlertHandler] = {
+        lt.save_resume_data_alert: _handle_save_resume_data,
+        lt.save_resume_data_failed_alert: _handle_save_resume_data_failed,
+        lt.add_torrent_alert: _handle_add_torrent,
+        lt.torrent_removed_alert: _handle_torrent_removed,
+        lt.metadata_received_alert: _handle_metadata_received,
+    }
+
+    def _handle_alert(self, alert: lt.alert) -> None:
+        handler = self._ALERT_HANDLERS.get(type(alert))
+        if handler is not None:
+            handler(self, alert)
 
     def _run(self) -> None:
         with self._iterator:
@@ -312,7 +507,8 @@ class _ReceiverTask(task_lib.Task):
 
         self._log_terminate()
         _LOG.debug("waiting for fastresume data to be written to disk")
-        self._io_executor.shutdown()
+        for executor in self._io_executors:
+            executor.shutdown()
 
 
 class _TriggerTask(task_lib.Task):
@@ -320,7 +516,7 @@ class _TriggerTask(task_lib.Task):
         self,
         *,
         resume_service: "ResumeService",
-        alert_driver: driver_lib.AlertDriver
+        alert_driver: driver_lib.AlertDriver,
     ):
         super().__init__(
             title="fastresume save trigger", thread_name="fastresume.trigger"
@@ -343,8 +539,7 @@ class _TriggerTask(task_lib.Task):
             for alert in self._iterator:
                 torrent_alert = cast(lt.torrent_alert, alert)
                 self._resume_service.save(
-                    torrent_alert.handle,
-                    flags=lt.torrent_handle.only_if_modified,
+                    torrent_alert.handle, flags=_ONLY_IF_MODIFIED
                 )
 
 
@@ -360,9 +555,7 @@ class _PeriodicTask(task_lib.Task):
 
     def _run(self) -> None:
         while not self._terminated.wait(SAVE_ALL_INTERVAL):
-            self._resume_service.save_all(
-                flags=lt.torrent_handle.only_if_modified
-            )
+            self._resume_service.save_all(flags=_ONLY_IF_MODIFIED)
 
 
 class ResumeService(task_lib.Task):
@@ -374,10 +567,13 @@ class ResumeService(task_lib.Task):
         config_dir: pathlib.Path,
         session: lt.session,
         alert_driver: driver_lib.AlertDriver,
-        pedantic=False
+        pedantic=False,
     ):
         super().__init__(title="ResumeService", thread_name="resume")
         self.data_dir = config_dir.joinpath(RESUME_DATA_DIR_NAME)
+        # Paths are requested for every save, so build them once per torrent.
+        # Keyed by info_hash.to_bytes(), as sha1_hash may not hash by value
+        self._paths: Dict[bytes, Tuple[pathlib.Path, pathlib.Path]] = {}
         self._counter = _Counter()
         self._session = session
 
@@ -397,11 +593,28 @@ class ResumeService(task_lib.Task):
         self._add_child(self._trigger_task, start=False)
         self._add_child(self._periodic_task, start=False)
 
+    def _get_paths(
+        self, info_hash: lt.sha1_hash
+    ) -> Tuple[pathlib.Path, pathlib.Path]:
+        key = info_hash.to_bytes()
+        paths = self._paths.get(key)
+        if paths is None:
+            paths = (
+                self.data_dir.joinpath(f"{info_hash}.resume"),
+                self.data_dir.joinpath(f"{info_hash}.torrent"),
+            )
+            self._paths[key] = paths
+        return paths
+
+    def forget_paths(self, info_hash: lt.sha1_hash) -> None:
+        """Drops the cached resume data paths for a removed torrent."""
+        self._paths.pop(info_hash.to_bytes(), None)
+
     def get_resume_data_path(self, info_hash: lt.sha1_hash) -> pathlib.Path:
-        return self.data_dir.joinpath(str(info_hash)).with_suffix(".resume")
+        return self._get_paths(info_hash)[0]
 
     def get_torrent_path(self, info_hash: lt.sha1_hash) -> pathlib.Path:
-        return self.data_dir.joinpath(str(info_hash)).with_suffix(".torrent")
+        return self._get_paths(info_hash)[1]
 
     def _terminate(self) -> None:
         pass
@@ -423,10 +636,7 @@ class ResumeService(task_lib.Task):
         self._trigger_task.join()
         self._periodic_task.join()
 
-        self.save_all(
-            flags=lt.torrent_handle.only_if_modified
-            | lt.torrent_handle.flush_disk_cache
-        )
+        self.save_all(flags=_ONLY_IF_MODIFIED | _FLUSH_DISK_CACHE)
 
         # At this point, no more save()s will be issued
         _LOG.debug("waiting for final fastresume data")
@@ -440,14 +650,21 @@ class ResumeService(task_lib.Task):
         self._receiver_task.join()
 
     def save(self, handle: lt.torrent_handle, flags: int = 0) -> None:
+        # Count the request before making it: the alert may be handled on
+        # another thread before save_resume_data() even returns. No lock is
+        # held across the libtorrent call itself.
+        self._counter.inc(1)
+        requested = False
         try:
             with ltpy.translate_exceptions():
                 # Does not block
                 handle.save_resume_data(flags=flags)
+            requested = True
         except ltpy.InvalidTorrentHandleError:
             pass
-        else:
-            self._counter.inc(1)
+        finally:
+            if not requested:
+                self._counter.inc(-1)
 
     def save_all(self, flags: int = 0) -> None:
         # Loading all handles at once in python could be cumbersome at large
@@ -456,5 +673,19 @@ class ResumeService(task_lib.Task):
             # DOES block
             handles = self._session.get_torrents()
         _LOG.debug("saving fastresume data for %d torrents", len(handles))
-        for handle in handles:
-            self.save(handle, flags=flags)
+        # Count all the requests up front, rather than taking the counter's
+        # lock once per handle, then give back any we didn't make
+        self._counter.inc(len(handles))
+        requested = 0
+        try:
+            for handle in handles:
+                try:
+                    with ltpy.translate_exceptions():
+                        # Does not block
+                        handle.save_resume_data(flags=flags)
+                    requested += 1
+                except ltpy.InvalidTorrentHandleError:
+                    pass
+        finally:
+            if requested < len(handles):
+                self._counter.inc(requested - len(handles))
@@ -49,7 +49,7 @@ class Task(abc.ABC):
         self._terminated = threading.Event()
         self._forever = forever
         self.__done_callbacks: List[Callback] = []
-        self.__done_callbacks_called = False
+        self.__done_callbacks_called = threading.Event()
         # NB: As of 3.8, weakref.WeakSet is not subscriptable
         self.__children = weakref.WeakSet()  # type: weakref.WeakSet[Task]
 
@@ -74,10 +74,13 @@ class Task(abc.ABC):
             return list(self.__children)
 
     def add_done_callback(self, callback: Callback) -> None:
-        with self._lock:
-            if not self.__done_callbacks_called:
-                self.__done_callbacks.append(callback)
-                return
+        # Once callbacks have been called, the list is never used again, so
+        # we don't need the lock
+        if not self.__done_callbacks_called.is_set():
+            with self._lock:
+                if not self.__done_callbacks_called.is_set():
+                    self.__done_callbacks.append(callback)
+                    return
         try:
             callback(self)
         except Exception:
@@ -96,10 +99,13 @@ class Task(abc.ABC):
                 self.__exception = exception
 
     def terminate(self, exception: BaseException = None) -> None:
+        # Setting the exception and _terminated must be one atomic step.
+        # Subclasses check _terminated under the lock before accepting work,
+        # and _set_exception() may fail the work they already hold
         with self._lock:
-            self._terminated.set()
             if exception is not None:
                 self._set_exception(exception)
+            self._terminated.set()
         self._terminate()
 
     def _log_terminate(self) -> None:
@@ -126,14 +132,16 @@ class Task(abc.ABC):
         else:
             _LOG.debug("shutdown complete: %s", self._title)
 
-        for child in self._get_children():
+        children = self._get_children()
+        for child in children:
             child.terminate()
-        for child in self._get_children():
+        for child in children:
             child.join()
 
         with self._lock:
-            callbacks = list(self.__done_callbacks)
-            self.__done_callbacks_called = True
+            callbacks = self.__done_callbacks
+            self.__done_callbacks = []
+            self.__done_callbacks_called.set()
         for callback in callbacks:
             try:
                 callback(self)
@@ -149,16 +157,14 @@ class Task(abc.ABC):
     def exception(self, timeout: float = None) -> Optional[BaseException]:
         if self._thread != threading.current_thread():
             self.join(timeout=timeout)
-        with self._lock:
-            return self._get_exception()
+        return self._get_exception()
 
     def result(self, timeout: float = None) -> None:
         if self._thread != threading.current_thread():
             self.join(timeout=timeout)
-        with self._lock:
-            exception = self._get_exception()
-            if exception is not None:
-                raise exception
+        exception = self._get_exception()
+        if exception is not None:
+            raise exception
 
 
 def terminate_task_on_future_fail(
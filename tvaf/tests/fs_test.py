@@ -53,6 +53,13 @@ class TestTraverse(unittest.TestCase):
     def test_normalize(self) -> None:
         self.assertIs(self.root.traverse("directory//file/"), self.file)
 
+    def test_parts(self) -> None:
+        self.assertIs(self.root.traverse(("directory", "file")), self.file)
+        self.assertIs(self.root.traverse(()), self.root)
+        self.assertIs(
+            self.directory.traverse(("/", "directory", "symlink")), self.file
+        )
+
     def test_not_found(self) -> None:
         with self.assertRaises(FileNotFoundError):
             self.root.traverse("does_not_exist")
@@ -13,14 +13,20 @@
 
 import ftplib
 import io
+import socket
 from typing import Any
 from typing import cast
 from typing import List
+from typing import Optional
 from typing import Tuple
 from typing import Type
 import unittest
 
+import pyftpdlib.handlers
+
 from tvaf import auth
+from tvaf import config as config_lib
+from tvaf import fs
 from tvaf import ftp
 from tvaf import library
 from tvaf import types
@@ -38,6 +44,47 @@ def _raise_dummy() -> None:
     raise DummyException()
 
 
+class _NonBlockingRaw(io.RawIOBase):
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf: Any) -> Optional[int]:
+        # No data available yet
+        return None
+
+
+class TestFileProducer(unittest.TestCase):
+    def drain(self, producer: ftp._FileProducer) -> bytes:
+        chunks: List[bytes] = []
+        while True:
+            # The producer reuses its buffer, so copy each block
+            chunk = bytes(producer.more())
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def test_binary(self) -> None:
+        # Two full blocks, then a short read at EOF
+        size = ftp._FileProducer.buffer_size
+        data = bytes(range(256)) * ((size * 2 + 100) // 256 + 1)
+        data = data[: size * 2 + 100]
+        producer = ftp._FileProducer(io.BytesIO(data), "i")
+        self.assertEqual(self.drain(producer), data)
+
+    def test_empty(self) -> None:
+        producer = ftp._FileProducer(io.BytesIO(b""), "i")
+        self.assertEqual(self.drain(producer), b"")
+
+    def test_ascii(self) -> None:
+        producer = ftp._FileProducer(io.BytesIO(b"a\nb\n"), "a")
+        self.assertEqual(self.drain(producer), b"a\r\nb\r\n")
+
+    def test_readinto_none(self) -> None:
+        producer = ftp._FileProducer(_NonBlockingRaw(), "i")
+        with self.assertRaises(pyftpdlib.handlers._FileReadWriteError):
+            producer.more()
+
+
 class BaseFTPTest(unittest.TestCase):
 
     do_login = True
@@ -163,6 +210,21 @@ class TestPathStructure(BaseFTPTest):
         size = self.ftp.size(f"/v1/{ltu.SINGLE.info_hash}/test/i/0")
         self.assertEqual(size, ltu.SINGLE.files[0].length)
 
+    def test_sees_changes_between_commands(self) -> None:
+        # Lookups are only cached within a single command
+        self.ftp.voidcmd("TYPE I")
+        single = self.libs.root.traverse(f"v1/{ltu.SINGLE.info_hash}/test/i/0")
+        self.libs.browse_nodes["test"] = fs.Symlink(target=single)
+        self.assertEqual(
+            self.ftp.size("/browse/test"), ltu.SINGLE.files[0].length
+        )
+
+        multi = self.libs.root.traverse(f"v1/{ltu.MULTI.info_hash}/test/i/0")
+        self.libs.browse_nodes["test"] = fs.Symlink(target=multi)
+        self.assertEqual(
+            self.ftp.size("/browse/test"), ltu.MULTI.files[0].length
+        )
+
 
 class TestReadOnly(BaseFTPTest):
     def test_stou(self) -> None:
@@ -294,10 +356,50 @@ class TestConfig(BaseFTPTest):
         self.connect()
         self.assertEqual(self.ftp.pwd(), "/")
 
+    def test_change_server_model(self) -> None:
+        self.config["ftp_server_model"] = "async"
+        self.ftpd.set_config(self.config)
+        with self.assertRaises(EOFError):
+            self.ftp.pwd()
+        assert self.ftpd.socket is not None
+        self.address = self.ftpd.socket.getsockname()
+        self.connect()
+        self.assertEqual(self.ftp.pwd(), "/")
+
+    def test_change_server_model_fixed_port(self) -> None:
+        # Rebinding the same port while the old server still listens would
+        # fail with EADDRINUSE. Port 0 can't catch that, so pick a real port
+        with socket.socket() as sock:
+            sock.bind(("localhost", 0))
+            self.config["ftp_port"] = sock.getsockname()[1]
+        self.ftpd.set_config(self.config)
+        assert self.ftpd.socket is not None
+        self.address = self.ftpd.socket.getsockname()
+        self.connect()
+        self.assertEqual(self.ftp.pwd(), "/")
+
+        self.config["ftp_server_model"] = "async"
+        self.ftpd.set_config(self.config)
+        with self.assertRaises(EOFError):
+            self.ftp.pwd()
+        assert self.ftpd.socket is not None
+        self.assertEqual(self.ftpd.socket.getsockname(), self.address)
+        self.connect()
+        self.assertEqual(self.ftp.pwd(), "/")
+
+    def test_bad_server_model(self) -> None:
+        self.config["ftp_server_model"] = "fork"
+        with self.assertRaises(config_lib.InvalidConfigError):
+            self.ftpd.set_config(self.config)
+
+        # Should still be connected
+        self.assertEqual(self.ftp.pwd(), "/")
+
     def test_default_config(self) -> None:
         # Ensure we set some default values
         self.assertEqual(self.config["ftp_enabled"], True)
         self.assertEqual(self.config["ftp_bind_address"], "localhost")
+        self.assertEqual(self.config["ftp_server_model"], "thread")
 
     def test_stage_revert(self) -> None:
         self.connect()
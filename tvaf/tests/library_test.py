@@ -11,10 +11,12 @@
 # OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
 # PERFORMANCE OF THIS SOFTWARE.
 
+import functools
 import io
 import stat as stat_lib
 from typing import Any
 from typing import cast
+from typing import Dict
 from typing import Iterable
 from typing import Tuple
 from typing import Union
@@ -24,33 +26,86 @@ import libtorrent as lt
 
 from tvaf import fs
 from tvaf import library
-from tvaf import protocol
+from tvaf import types
 
 from . import library_test_utils as ltu
 from . import tdummy
 
 
+@functools.lru_cache(maxsize=None)
 def get_placeholder_data(info_hash: str, start: int, stop: int) -> bytes:
-    data = f"{info_hash}:{start}:{stop}"
-    return data.encode()
+    return b"%b:%d:%d" % (info_hash.encode("ascii"), start, stop)
+
+
+# The first character of stat.filemode() for each file type
+_MODE_CHAR = {
+    stat_lib.S_IFDIR: "d",
+    stat_lib.S_IFREG: "-",
+    stat_lib.S_IFLNK: "l",
+}
+
+# lt.sha1_hash is copied on assignment to atp.info_hash, so these can be shared
+_SHA1_HASHES = {t.info_hash: t.sha1_hash for t in ltu.TORRENTS}
+
+# Torrents whose file paths collide, and the by-index entries they should
+# still have
+_CONFLICT_CASES = (
+    (ltu.CONFLICT_FILE, (0, 1)),
+    (ltu.CONFLICT_FILE_DIR, (0, 1)),
+    (ltu.CONFLICT_DIR_FILE, (0, 1)),
+)
+
+# Names that int() would parse as a valid file index, but which aren't how
+# we spell it
+_NON_CANONICAL_INDEXES = ("01", "00", "+1", " 1", "1 ", "-0", "1_0", "-1")
+
+# Paths are pre-split, so tests can share prefixes and skip splitting
+_V1 = ("v1",)
 
 
 class TestLibraryService(unittest.TestCase):
-    def setUp(self) -> None:
+
+    torrents: Dict[types.InfoHash, tdummy.Torrent]
+    paths: Dict[types.InfoHash, Dict[str, fs.PathParts]]
+    libraries: library.Libraries
+    libs: library.LibraryService
+    _networks: Dict[str, library.Network]
+
+    @classmethod
+    def setUpClass(cls) -> None:
         def opener(
             info_hash: str, start: int, stop: int, _: Any
         ) -> io.BytesIO:
+            # get_placeholder_data() is cached, and a full read() of a fresh
+            # BytesIO returns the very bytes object it wraps. So
+            # assert_torrent_file() compares an object against itself.
             return io.BytesIO(get_placeholder_data(info_hash, start, stop))
 
-        self.torrents = {
-            torrent.info_hash: torrent for torrent in ltu.TORRENTS
-        }
-        self.libraries = library.Libraries()
-        ltu.add_test_libraries(self.libraries)
-        self.libs = library.LibraryService(
-            opener=opener, libraries=self.libraries
+        # The service and libraries are built once. setUp() resets the few
+        # things that tests change
+        cls.torrents = {torrent.info_hash: torrent for torrent in ltu.TORRENTS}
+        cls.paths = {}
+        for info_hash in cls.torrents:
+            root = _V1 + (info_hash,)
+            test = root + ("test",)
+            cls.paths[info_hash] = {
+                "root": root,
+                "test": test,
+                "f": test + ("f",),
+                "i": test + ("i",),
+            }
+        cls.libraries = library.Libraries()
+        ltu.add_test_libraries(cls.libraries)
+        cls._networks = dict(cls.libraries.networks)
+        cls.libs = library.LibraryService(
+            opener=opener, libraries=cls.libraries
         )
 
+    def setUp(self) -> None:
+        self.libraries.networks.clear()
+        self.libraries.networks.update(self._networks)
+        self.libs.browse_nodes.clear()
+
     def assert_torrent_file(
         self,
         tfile: library.TorrentFile,
@@ -67,7 +122,7 @@ class TestLibraryService(unittest.TestCase):
                 dummy_file = dummy.files[dummy_file]
             start = dummy_file.start
             stop = dummy_file.stop
-            filename = protocol.decode(dummy_file.path_split[-1])
+            filename = dummy_file.filename
         assert filename is not None
         assert info_hash is not None
         assert start is not None
@@ -82,14 +137,32 @@ class TestLibraryService(unittest.TestCase):
         )
 
         atp = lt.add_torrent_params()
-        atp.info_hash = lt.sha1_hash(bytes.fromhex(info_hash))
+        atp.info_hash = _SHA1_HASHES[info_hash]
         tfile.configure_atp(atp)
         assert atp.ti is not None
-        self.assertEqual(atp.ti.metadata(), lt.bencode(dummy.info))
+        self.assertEqual(atp.ti.metadata(), dummy.bencoded_info)
 
     def assert_is_dir(self, node: fs.Node) -> None:
         self.assertEqual(node.stat().filetype, stat_lib.S_IFDIR)
 
+    def traverse_dir(self, path: Union[fs.PathLike, fs.PathParts]) -> fs.Dir:
+        node = self.libs.root.traverse(path)
+        self.assert_is_dir(node)
+        assert isinstance(node, fs.Dir)
+        return node
+
+    def assert_by_index(
+        self, dummy: tdummy.Torrent, indexes: Iterable[int]
+    ) -> None:
+        by_index = self.traverse_dir(self.paths[dummy.info_hash]["i"])
+        indexes = list(indexes)
+        self.assert_dirents_like(
+            by_index.readdir(), [("-", str(i)) for i in indexes]
+        )
+        for i in indexes:
+            tfile = cast(library.TorrentFile, by_index.lookup(str(i)))
+            self.assert_torrent_file(tfile, dummy=dummy, dummy_file=i)
+
     def assert_is_regular_file(self, node: fs.Node) -> None:
         self.assertEqual(node.stat().filetype, stat_lib.S_IFREG)
 
@@ -99,23 +172,30 @@ class TestLibraryService(unittest.TestCase):
     def assert_dirents_like(
         self, dirents: Iterable[fs.Dirent], expected: Iterable[Tuple[str, str]]
     ) -> None:
-        got = [(stat_lib.filemode(d.stat.filetype), d.name) for d in dirents]
         expected = list(expected)
-        # Test file types only
-        if expected and len(expected[0][0]) == 1:
-            got = [(mode[0], name) for mode, name in got]
+        if expected and len(expected[0][0]) != 1:
+            got = [
+                (stat_lib.filemode(d.stat.filetype), d.name) for d in dirents
+            ]
+        else:
+            # Test file types only
+            got = [
+                (_MODE_CHAR.get(d.stat.filetype, "?"), d.name) for d in dirents
+            ]
         self.assertCountEqual(got, expected)
 
     def test_get_torrent_path(self) -> None:
         for info_hash in self.torrents:
-            path = self.libs.get_torrent_path(info_hash)
-            torrent_dir = self.libs.root.traverse(path)
-            self.assert_is_dir(torrent_dir)
+            with self.subTest(info_hash):
+                path = self.libs.get_torrent_path(info_hash)
+                torrent_dir = self.libs.root.traverse(path)
+                self.assert_is_dir(torrent_dir)
 
     def test_lookup_torrent(self) -> None:
         for info_hash in self.torrents:
-            torrent_dir = self.libs.lookup_torrent(info_hash)
-            self.assert_is_dir(torrent_dir)
+            with self.subTest(info_hash):
+                torrent_dir = self.libs.lookup_torrent(info_hash)
+                self.assert_is_dir(torrent_dir)
 
     def test_browse(self) -> None:
         test_dir = fs.StaticDir()
@@ -125,8 +205,7 @@ class TestLibraryService(unittest.TestCase):
         )
         self.libs.browse_nodes["test"] = test_dir
 
-        browse = cast(fs.Dir, self.libs.root.traverse("browse"))
-        self.assert_is_dir(browse)
+        browse = self.traverse_dir("browse")
         self.assert_dirents_like(browse.readdir(), [("d", "test")])
 
         test_dir = cast(fs.StaticDir, browse.lookup("test"))
@@ -143,71 +222,75 @@ class TestLibraryService(unittest.TestCase):
         )
 
     def test_v1_lookup(self) -> None:
-        for info_hash in self.torrents:
-            self.assert_is_dir(self.libs.root.traverse(f"v1/{info_hash}"))
+        for info_hash, paths in self.paths.items():
+            with self.subTest(info_hash):
+                self.assert_is_dir(self.libs.root.traverse(paths["root"]))
 
     def test_v1_lookup_bad(self) -> None:
-        v1_dir = cast(fs.Dir, self.libs.root.traverse("v1"))
-        self.assert_is_dir(v1_dir)
+        v1_dir = self.traverse_dir("v1")
         with self.assertRaises(FileNotFoundError):
             v1_dir.lookup("0" * 40)
 
     def test_v1_readdir(self) -> None:
-        v1_dir = cast(fs.Dir, self.libs.root.traverse("v1"))
-        self.assert_is_dir(v1_dir)
+        v1_dir = self.traverse_dir("v1")
         with self.assertRaises(OSError):
             list(v1_dir.readdir())
 
     def test_torrent_dir_readdir(self) -> None:
-        for info_hash in self.torrents:
-            torrent_dir = cast(
-                fs.Dir, self.libs.root.traverse(f"v1/{info_hash}")
-            )
-            self.assert_is_dir(torrent_dir)
-            self.assert_dirents_like(torrent_dir.readdir(), [("d", "test")])
+        for info_hash, paths in self.paths.items():
+            with self.subTest(info_hash):
+                torrent_dir = self.traverse_dir(paths["root"])
+                self.assert_dirents_like(
+                    torrent_dir.readdir(), [("d", "test")]
+                )
 
     def test_torrent_dir_lookup(self) -> None:
-        for info_hash in self.torrents:
-            self.assert_is_dir(self.libs.root.traverse(f"v1/{info_hash}/test"))
+        for info_hash, paths in self.paths.items():
+            with self.subTest(info_hash):
+                self.assert_is_dir(self.libs.root.traverse(paths["test"]))
 
     def test_torrent_dir_lookup_bad(self) -> None:
-        for info_hash in self.torrents:
-            with self.assertRaises(FileNotFoundError):
-                self.assert_is_dir(
-                    self.libs.root.traverse(f"v1/{info_hash}/does-not-exist")
-                )
+        for info_hash, paths in self.paths.items():
+            with self.subTest(info_hash):
+                with self.assertRaises(FileNotFoundError):
+                    self.assert_is_dir(
+                        self.libs.root.traverse(
+                            paths["root"] + ("does-not-exist",)
+                        )
+                    )
 
     def test_torrent_dir_with_no_network(self) -> None:
         self.libraries.networks.clear()
-        torrent_dir = cast(
-            fs.Dir, self.libs.root.traverse(f"v1/{ltu.SINGLE.info_hash}")
+        torrent_dir = self.traverse_dir(
+            self.paths[ltu.SINGLE.info_hash]["root"]
         )
-        self.assert_is_dir(torrent_dir)
         self.assert_dirents_like(torrent_dir.readdir(), [])
 
+    def test_network_dir_reused(self) -> None:
+        path = self.paths[ltu.SINGLE.info_hash]["test"]
+        network_dir = self.libs.root.traverse(path)
+        self.assertIs(self.libs.root.traverse(path), network_dir)
+
+        # Replacing the network should not reuse the old tree
+        self.libraries.networks["test"] = ltu.Network(*ltu.TORRENTS)
+        self.assertIsNot(self.libs.root.traverse(path), network_dir)
+
     def test_network_readdir(self) -> None:
-        for info_hash in self.torrents:
-            network = cast(
-                fs.Dir, self.libs.root.traverse(f"v1/{info_hash}/test")
-            )
-            self.assert_dirents_like(
-                network.readdir(), [("d", "f"), ("d", "i")]
-            )
+        for info_hash, paths in self.paths.items():
+            with self.subTest(info_hash):
+                network = self.traverse_dir(paths["test"])
+                self.assert_dirents_like(
+                    network.readdir(), [("d", "f"), ("d", "i")]
+                )
 
     def test_network_lookup(self) -> None:
-        for info_hash in self.torrents:
-            self.assert_is_dir(
-                self.libs.root.traverse(f"v1/{info_hash}/test/f")
-            )
-            self.assert_is_dir(
-                self.libs.root.traverse(f"v1/{info_hash}/test/i")
-            )
+        for info_hash, paths in self.paths.items():
+            with self.subTest(info_hash):
+                self.assert_is_dir(self.libs.root.traverse(paths["f"]))
+                self.assert_is_dir(self.libs.root.traverse(paths["i"]))
 
     def test_by_path_single(self) -> None:
-        by_path = cast(
-            fs.Dir,
-            self.libs.root.traverse(f"v1/{ltu.SINGLE.info_hash}/test/f"),
-        )
+        by_path = self.traverse_dir(self.paths[ltu.SINGLE.info_hash]["f"])
 
         self.assert_dirents_like(by_path.readdir(), [("l", "test.txt")])
 
@@ -216,10 +299,7 @@ class TestLibraryService(unittest.TestCase):
         self.assertEqual(str(link.readlink()), "../i/0")
 
     def test_by_index_single(self) -> None:
-        by_index = cast(
-            fs.Dir,
-            self.libs.root.traverse(f"v1/{ltu.SINGLE.info_hash}/test/i"),
-        )
+        by_index = self.traverse_dir(self.paths[ltu.SINGLE.info_hash]["i"])
 
         self.assert_dirents_like(by_index.readdir(), [("-", "0")])
 
@@ -227,9 +307,7 @@ class TestLibraryService(unittest.TestCase):
         self.assert_torrent_file(tfile, dummy=ltu.SINGLE, dummy_file=0)
 
     def test_by_path_multi(self) -> None:
-        by_path = cast(
-            fs.Dir, self.libs.root.traverse(f"v1/{ltu.MULTI.info_hash}/test/f")
-        )
+        by_path = self.traverse_dir(self.paths[ltu.MULTI.info_hash]["f"])
 
         self.assert_dirents_like(by_path.readdir(), [("d", "multi")])
 
@@ -249,9 +327,7 @@ class TestLibraryService(unittest.TestCase):
         self.assertEqual(str(link.readlink()), "../../i/1")
 
     def test_by_index_multi(self) -> None:
-        by_index = cast(
-            fs.Dir, self.libs.root.traverse(f"v1/{ltu.MULTI.info_hash}/test/i")
-        )
+        by_index = self.traverse_dir(self.paths[ltu.MULTI.info_hash]["i"])
 
         self.assert_dirents_like(by_index.readdir(), [("-", "0"), ("-", "1")])
 
@@ -261,98 +337,38 @@ class TestLibraryService(unittest.TestCase):
         tfile = cast(library.TorrentFile, by_index.lookup("1"))
         self.assert_torrent_file(tfile, dummy=ltu.MULTI, dummy_file=1)
 
-    def test_conflict_file(self) -> None:
+    def test_conflicts(self) -> None:
         # Don't test by-path directory, as its contents are undefined. Do test
         # that the by-index path still holds file references.
-        by_index = cast(
-            fs.Dir,
-            self.libs.root.traverse(
-                f"v1/{ltu.CONFLICT_FILE.info_hash}/test/i"
-            ),
-        )
-
-        self.assert_dirents_like(by_index.readdir(), [("-", "0"), ("-", "1")])
-
-        for i in range(len(ltu.CONFLICT_FILE.files)):
-            tfile = cast(library.TorrentFile, by_index.lookup(str(i)))
-            self.assert_torrent_file(
-                tfile, dummy=ltu.CONFLICT_FILE, dummy_file=i
-            )
-
-    def test_conflict_file_dir(self) -> None:
-        # Don't test by-path directory, as its contents are undefined. Do test
-        # that the by-index path still holds file references.
-        by_index = cast(
-            fs.Dir,
-            self.libs.root.traverse(
-                f"v1/{ltu.CONFLICT_FILE_DIR.info_hash}/test/i"
-            ),
-        )
-
-        self.assert_dirents_like(by_index.readdir(), [("-", "0"), ("-", "1")])
-
-        for i in range(len(ltu.CONFLICT_FILE_DIR.files)):
-            tfile = cast(library.TorrentFile, by_index.lookup(str(i)))
-            self.assert_torrent_file(
-                tfile, dummy=ltu.CONFLICT_FILE_DIR, dummy_file=i
-            )
-
-    def test_conflict_dir_file(self) -> None:
-        # Don't test by-path directory, as its contents are undefined. Do test
-        # that the by-index path still holds file references.
-        by_index = cast(
-            fs.Dir,
-            self.libs.root.traverse(
-                f"v1/{ltu.CONFLICT_DIR_FILE.info_hash}/test/i"
-            ),
-        )
-
-        self.assert_dirents_like(by_index.readdir(), [("-", "0"), ("-", "1")])
-
-        for i in range(len(ltu.CONFLICT_DIR_FILE.files)):
-            tfile = cast(library.TorrentFile, by_index.lookup(str(i)))
-            self.assert_torrent_file(
-                tfile, dummy=ltu.CONFLICT_DIR_FILE, dummy_file=i
-            )
+        for dummy, indexes in _CONFLICT_CASES:
+            with self.subTest(dummy.info_hash):
+                self.assert_by_index(dummy, indexes)
 
     def test_bad_paths(self) -> None:
         # All paths in BAD_PATHS are bad, so the by-path directory should be
         # empty.
-        by_path = cast(
-            fs.Dir,
-            self.libs.root.traverse(f"v1/{ltu.BAD_PATHS.info_hash}/test/f"),
-        )
+        by_path = self.traverse_dir(self.paths[ltu.BAD_PATHS.info_hash]["f"])
         self.assert_dirents_like(by_path.readdir(), [])
 
-        by_index = cast(
-            fs.Dir,
-            self.libs.root.traverse(f"v1/{ltu.BAD_PATHS.info_hash}/test/i"),
-        )
-
         # Ensure we can still access files by index.
-        self.assert_dirents_like(
-            by_index.readdir(), [("-", "0"), ("-", "1"), ("-", "2")]
-        )
+        self.assert_by_index(ltu.BAD_PATHS, [0, 1, 2])
 
-        for i in range(len(ltu.BAD_PATHS.files)):
-            tfile = cast(library.TorrentFile, by_index.lookup(str(i)))
-            self.assert_torrent_file(tfile, dummy=ltu.BAD_PATHS, dummy_file=i)
+    def test_by_index_non_canonical(self) -> None:
+        by_index = self.traverse_dir(self.paths[ltu.BAD_PATHS.info_hash]["i"])
+        for name in _NON_CANONICAL_INDEXES:
+            with self.subTest(name):
+                with self.assertRaises(FileNotFoundError):
+                    by_index.lookup(name)
 
     def test_padded(self) -> None:
-        by_path = cast(
-            fs.Dir,
-            self.libs.root.traverse(
-                f"v1/{ltu.PADDED.info_hash}/test/f/padded"
-            ),
+        by_path = self.traverse_dir(
+            self.paths[ltu.PADDED.info_hash]["f"] + ("padded",)
         )
         self.assert_dirents_like(
             by_path.readdir(), [("l", "file.tar.gz"), ("l", "info.nfo")]
         )
 
-        by_index = cast(
-            fs.Dir,
-            self.libs.root.traverse(f"v1/{ltu.PADDED.info_hash}/test/i"),
-        )
+        by_index = self.traverse_dir(self.paths[ltu.PADDED.info_hash]["i"])
 
         # Ensure we can still access files by index.
         self.assert_dirents_like(by_index.readdir(), [("-", "0"), ("-", "2")])
@@ -11,8 +11,10 @@
 # OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
 # PERFORMANCE OF THIS SOFTWARE.
 
+import concurrent.futures
 import pathlib
 import tempfile
+import threading
 from typing import Any
 from typing import cast
 from typing import Dict
@@ -20,6 +22,7 @@ from typing import Hashable
 from typing import List
 from typing import Set
 import unittest
+import unittest.mock
 
 import libtorrent as lt
 
@@ -144,6 +147,24 @@ class IterResumeDataTest(unittest.TestCase):
             set(atps), {self.TORRENT1.atp(), self.TORRENT2.atp()}
         )
 
+    def test_bounded_reads(self) -> None:
+        for i in range(resume_lib.IO_CONCURRENCY * 3):
+            self.resume_data_dir.joinpath(f"{i:040x}.resume").touch()
+        loaded: List[pathlib.Path] = []
+
+        def load(path: pathlib.Path) -> lt.add_torrent_params:
+            loaded.append(path)
+            return lt.add_torrent_params()
+
+        with unittest.mock.patch.object(
+            resume_lib, "_try_load_resume_data", load
+        ):
+            atps = resume_lib.iter_resume_data_from_disk(self.config_dir)
+            next(atps)
+            # Files aren't all loaded before the first result is consumed
+            self.assertLessEqual(len(loaded), resume_lib.IO_CONCURRENCY)
+            atps.close()
+
 
 class TerminateTest(unittest.TestCase):
     def setUp(self) -> None:
@@ -283,6 +304,99 @@ class TerminateTest(unittest.TestCase):
         self.assertEqual(atps, [])
 
 
+def _done_future(result: Any) -> concurrent.futures.Future:
+    future: concurrent.futures.Future = concurrent.futures.Future()
+    future.set_result(result)
+    return future
+
+
+class ReceiverIOTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.session_service = lib.create_isolated_session_service()
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.alert_driver = driver_lib.AlertDriver(
+            session_service=self.session_service
+        )
+        self.resume = resume_lib.ResumeService(
+            session=self.session_service.session,
+            config_dir=pathlib.Path(self.tempdir.name),
+            alert_driver=self.alert_driver,
+            pedantic=True,
+        )
+        # Drive the receiver's IO queue directly, without running any tasks
+        self.receiver = self.resume._receiver_task
+        self.info_hash = tdummy.DEFAULT.sha1_hash
+        self.resume_path = self.resume.get_resume_data_path(self.info_hash)
+        self.torrent_path = self.resume.get_torrent_path(self.info_hash)
+
+    def tearDown(self) -> None:
+        self.receiver.terminate()
+        self.drain()
+        self.tempdir.cleanup()
+
+    def drain(self) -> None:
+        for executor in self.receiver._io_executors:
+            executor.shutdown()
+
+    def block_io(self) -> threading.Event:
+        # Hold the info hash's IO queue until the returned event is set
+        unblock = threading.Event()
+        self.receiver._io_submit(self.info_hash, unblock.wait)
+        return unblock
+
+    def test_superseded_write_is_skipped(self) -> None:
+        unblock = self.block_io()
+        stale_check = unittest.mock.Mock(spec=concurrent.futures.Future)
+        self.receiver._submit_write_atp(stale_check, self.info_hash, b"stale")
+        self.receiver._submit_write_atp(
+            _done_future(True), self.info_hash, b"latest"
+        )
+        unblock.set()
+        self.drain()
+
+        # The stale write returned before even waiting on its check
+        stale_check.result.assert_not_called()
+        self.assertEqual(self.resume_path.read_bytes(), b"latest")
+
+    def test_delete_queued_after_write(self) -> None:
+        unblock = self.block_io()
+        self.receiver._submit_write_atp(
+            _done_future(True), self.info_hash, b"data"
+        )
+        self.receiver._submit_write_ti(
+            _done_future(True), self.info_hash, b"d4:name4:teste"
+        )
+        self.receiver._submit_delete(self.info_hash)
+        unblock.set()
+        self.drain()
+
+        self.assertFalse(self.resume_path.exists())
+        self.assertFalse(self.torrent_path.exists())
+
+    def test_delete_after_completed_write(self) -> None:
+        self.receiver._submit_write_atp(
+            _done_future(True), self.info_hash, b"data"
+        )
+        for _ in lib.loop_until_timeout(5, msg="write"):
+            if self.resume_path.exists():
+                break
+        self.receiver._submit_delete(self.info_hash)
+        self.drain()
+
+        self.assertFalse(self.resume_path.exists())
+
+    def test_save_after_delete_forgets_paths(self) -> None:
+        self.receiver._submit_delete(self.info_hash)
+        # A save_resume_data_alert for the removed torrent fails its check
+        self.receiver._submit_write_atp(
+            _done_future(False), self.info_hash, b"zombie"
+        )
+        self.drain()
+
+        self.assertFalse(self.resume_path.exists())
+        self.assertNotIn(self.info_hash.to_bytes(), self.resume._paths)
+
+
 # TODO: test underflow, with and without pedantic
 
 # TODO: test magnets
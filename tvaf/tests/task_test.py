@@ -11,6 +11,8 @@
 # OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
 # PERFORMANCE OF THIS SOFTWARE.
 
+import threading
+from typing import List
 from typing import Optional
 import unittest
 import unittest.mock
@@ -76,6 +78,34 @@ class Failer(task_lib.Task):
         raise FailerException()
 
 
+class Acceptor(task_lib.Task):
+    """Accepts items until terminated, like request._TorrentTask."""
+
+    def __init__(self):
+        super().__init__(title="Acceptor")
+        self.pending: List[int] = []
+        self.failed: List[int] = []
+
+    def add(self, item: int) -> bool:
+        with self._lock:
+            if self._terminated.is_set():
+                return False
+            self.pending.append(item)
+            return True
+
+    def _set_exception(self, exception: BaseException) -> None:
+        with self._lock:
+            super()._set_exception(exception)
+            self.failed.extend(self.pending)
+            self.pending.clear()
+
+    def _terminate(self) -> None:
+        pass
+
+    def _run(self) -> None:
+        self._terminated.wait()
+
+
 class Fundamentals(unittest.TestCase):
     def setUp(self) -> None:
         self.task: task_lib.Task = Bounded()
@@ -269,3 +299,33 @@ class CatchChildErrorsTest(NormalTerminationTests):
 
     def runs_forever(self) -> bool:
         return True
+
+
+class TerminateRaceTest(unittest.TestCase):
+    def test_add_during_terminate(self) -> None:
+        task = Acceptor()
+        task.start()
+        task.add(0)
+
+        results: List[bool] = []
+        adder = threading.Thread(target=lambda: results.append(task.add(1)))
+        set_terminated = task._terminated.set
+
+        def start_adder_then_set() -> None:
+            # Give a concurrent add() every chance to land between the
+            # exception being set and the task being marked terminated
+            adder.start()
+            adder.join(timeout=0.1)
+            set_terminated()
+
+        with unittest.mock.patch.object(
+            task._terminated, "set", start_adder_then_set
+        ):
+            task.terminate(ExternalTerminateException())
+        adder.join()
+        task.join()
+
+        # The late item must be refused, not left pending forever
+        self.assertEqual(results, [False])
+        self.assertEqual(task.pending, [])
+        self.assertEqual(task.failed, [0])
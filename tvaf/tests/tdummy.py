@@ -86,6 +86,13 @@ class File:
         self.attr = attr or b""
         self.start = start
         self.stop = stop
+        self._filename: Optional[str] = None
+
+    @property
+    def filename(self) -> str:
+        if self._filename is None:
+            self._filename = protocol.decode(self.path_split[-1])
+        return self._filename
 
     @property
     def data(self) -> bytes:
@@ -138,7 +145,9 @@ class Torrent:
         self._pieces: Optional[List[bytes]] = None
         self._info: Optional[protocol.BDict] = None
         self._dict: Optional[Dict[bytes, Any]] = None
+        self._bencoded_info: Optional[bytes] = None
         self._info_hash_bytes: Optional[bytes] = None
+        self._torrent_info: Optional[lt.torrent_info] = None
 
     @property
     def data(self) -> bytes:
@@ -191,12 +200,16 @@ class Torrent:
             }
         return self._dict
 
+    @property
+    def bencoded_info(self) -> bytes:
+        if self._bencoded_info is None:
+            self._bencoded_info = lt.bencode(self.info)
+        return self._bencoded_info
+
     @property
     def info_hash_bytes(self) -> bytes:
         if self._info_hash_bytes is None:
-            self._info_hash_bytes = hashlib.sha1(
-                lt.bencode(self.info)
-            ).digest()
+            self._info_hash_bytes = hashlib.sha1(self.bencoded_info).digest()
         return self._info_hash_bytes
 
     @property
@@ -208,7 +221,10 @@ class Torrent:
         return lt.sha1_hash(self.info_hash_bytes)
 
     def torrent_info(self) -> lt.torrent_info:
-        return lt.torrent_info(self.dict)
+        # Parse once, and hand out copies, since callers may modify them
+        if self._torrent_info is None:
+            self._torrent_info = lt.torrent_info(self.dict)
+        return lt.torrent_info(self._torrent_info)
 
     def atp(self) -> lt.add_torrent_params:
         atp = lt.add_torrent_params()